@@ -0,0 +1,98 @@
+"""Cold-start benchmark for worker scale-up.
+
+Starts fresh interpreters that import `main`, build the app with create_app()
+and poll /api/ready until it returns 200, for several startup configurations.
+
+    python bench_cold_start.py [--runs 10] [--docs 20000]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+CHILD = """
+import json, time
+t0 = time.perf_counter()
+import main
+t1 = time.perf_counter()
+app = main.create_app()
+t2 = time.perf_counter()
+client = app.test_client()
+while client.get('/api/ready').status_code != 200:
+    time.sleep(0.001)
+t3 = time.perf_counter()
+print(json.dumps({'import': t1 - t0, 'create_app': t2 - t1, 'ready': t3 - t0,
+                  'documents': main.rag_system.document_count}))
+"""
+
+WORDS = ("patient dose mg protocol sepsis triage fever chest pain insulin ward "
+         "antibiotic monitor oxygen saturation discharge allergy infusion").split()
+
+
+def build_artifact(path: str, docs: int):
+    sys.path.insert(0, BACKEND_DIR)
+    import main
+
+    rag = main.AdvancedRAGSystem()
+    for i in range(docs):
+        content = " ".join(WORDS[(i + j) % len(WORDS)] for j in range(40)) + f" protocol-{i}"
+        rag.add_document(f"protocol_{i}", content, {'source': 'benchmark'})
+    rag.save_artifact(path)
+
+
+def run_config(env_overrides: dict, runs: int) -> dict:
+    env = dict(os.environ, **env_overrides)
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        out = subprocess.run([sys.executable, "-c", CHILD], cwd=BACKEND_DIR, env=env,
+                             capture_output=True, text=True, check=True)
+        result = json.loads(out.stdout.strip().splitlines()[-1])
+        result['process'] = time.perf_counter() - started
+        samples.append(result)
+
+    def summary(key):
+        values = sorted(s[key] for s in samples)
+        return {'median_ms': round(statistics.median(values) * 1000, 1),
+                'max_ms': round(values[-1] * 1000, 1)}
+
+    return {
+        'documents': samples[0]['documents'],
+        'import': summary('import'),
+        'create_app': summary('create_app'),
+        'ready': summary('ready'),
+        'process_wall': summary('process')
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--docs", type=int, default=20000, help="documents in the prebuilt artifact")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        artifact = os.path.join(tmp, "knowledge_base.json")
+        build_artifact(artifact, args.docs)
+
+        configs = {
+            'demo (sample data, empty KB)': {'MEDIFLOW_LOAD_SAMPLE_DATA': 'true'},
+            'artifact, lazy': {'MEDIFLOW_LOAD_SAMPLE_DATA': 'false', 'MEDIFLOW_KB_ARTIFACT': artifact,
+                               'MEDIFLOW_KB_WARMUP': 'lazy'},
+            'artifact, background warm-up': {'MEDIFLOW_LOAD_SAMPLE_DATA': 'false', 'MEDIFLOW_KB_ARTIFACT': artifact,
+                                             'MEDIFLOW_KB_WARMUP': 'background'},
+            'artifact, eager': {'MEDIFLOW_LOAD_SAMPLE_DATA': 'false', 'MEDIFLOW_KB_ARTIFACT': artifact,
+                                'MEDIFLOW_KB_WARMUP': 'eager'},
+        }
+        for name, env in configs.items():
+            print(f"{name}: {json.dumps(run_config(env, args.runs))}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""Bulk knowledge-base ingestion benchmark.
+
+Writes a synthetic NDJSON corpus of the requested size, imports it with the
+same worker used by /api/knowledge/import and reports throughput and peak
+memory of the process.
+
+    python bench_ingest.py [--size-mb 1024] [--doc-words 400] [--corpus PATH]
+"""
+import argparse
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+
+import main
+
+WORDS = ("patient dose mg protocol sepsis triage fever chest pain insulin ward antibiotic "
+         "monitor oxygen saturation discharge allergy infusion renal hepatic contraindicated "
+         "paediatric adult maximum daily interval review escalate").split()
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is kilobytes on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def write_corpus(path: str, size_mb: int, doc_words: int) -> int:
+    target = size_mb * 1024 * 1024
+    written = 0
+    docs = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        while written < target:
+            content = " ".join(WORDS[(docs * 7 + i * 3) % len(WORDS)] for i in range(doc_words))
+            line = json.dumps({'id': f"doc_{docs}", 'content': f"{content} ref-{docs}",
+                               'metadata': {'type': 'protocol'}}) + "\n"
+            f.write(line)
+            written += len(line)
+            docs += 1
+    return docs
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=int, default=1024)
+    parser.add_argument("--doc-words", type=int, default=400)
+    parser.add_argument("--corpus", help="existing NDJSON corpus to import instead of generating one")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus = args.corpus
+        if not corpus:
+            corpus = os.path.join(tmp, "corpus.ndjson")
+            started = time.perf_counter()
+            docs = write_corpus(corpus, args.size_mb, args.doc_words)
+            print(f"generated {docs} documents ({args.size_mb} MB) in {time.perf_counter() - started:.1f}s")
+
+        baseline_rss = peak_rss_mb()
+        job = main.knowledge_importer.create_job(corpus, 'ndjson', 'benchmark')
+        started = time.perf_counter()
+        main.knowledge_importer.run_job(job)
+        elapsed = time.perf_counter() - started
+
+        query_started = time.perf_counter()
+        main.rag_system.semantic_search("sepsis antibiotic maximum daily dose", top_k=5)
+        query_ms = (time.perf_counter() - query_started) * 1000
+
+        print(json.dumps({
+            'status': job['status'],
+            'bytes': job['bytes_read'],
+            'documents': job['documents_read'],
+            'chunks': job['chunks_indexed'],
+            'batches': job['batches_committed'],
+            'seconds': round(elapsed, 2),
+            'docs_per_sec': round(job['documents_read'] / elapsed, 1),
+            'mb_per_sec': round(job['bytes_read'] / elapsed / (1024 * 1024), 2),
+            'peak_rss_mb': round(peak_rss_mb(), 1),
+            'baseline_rss_mb': round(baseline_rss, 1),
+            'search_after_import_ms': round(query_ms, 2)
+        }))
+
+
+if __name__ == '__main__':
+    main_cli()
@@ -1,16 +1,25 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Blueprint, current_app, request, jsonify
 from flask_cors import CORS
 from datetime import datetime, timedelta
 import os
+import sys
 import json
+import argparse
+import queue
+import shutil
+import tempfile
 import requests
-from collections import defaultdict, Counter
-import numpy as np
-from typing import List, Dict, Any
+import heapq
+import bisect
+import threading
+import time
+import uuid
+from collections import defaultdict, deque, Counter
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import List, Dict, Any, Optional, Tuple
 import re
 
-app = Flask(__name__)
-CORS(app)
+api = Blueprint('api', __name__)
 
 # ============================================
 # CONFIGURATION
@@ -24,6 +33,14 @@ TAVILY_API_KEY = os.getenv("TAVILY_API_KEY")
 GROQ_API_URL = "https://api.groq.com/openai/v1/chat/completions"
 TAVILY_API_URL = "https://api.tavily.com/search"
 
+# Defaults for create_app(); each can be overridden from the environment or the config argument
+DEFAULT_CONFIG = {
+    'LOAD_SAMPLE_DATA': os.getenv("MEDIFLOW_LOAD_SAMPLE_DATA", "true").lower() in ("1", "true", "yes"),
+    'KNOWLEDGE_BASE_ARTIFACT': os.getenv("MEDIFLOW_KB_ARTIFACT"),  # Prebuilt knowledge base + index
+    'KNOWLEDGE_BASE_WARMUP': os.getenv("MEDIFLOW_KB_WARMUP", "background"),  # One of WARMUP_MODES
+}
+WARMUP_MODES = ('background', 'eager', 'lazy')
+
 # ============================================
 # IN-MEMORY DATA STORAGE (Real-time tracking)
 # ============================================
@@ -90,39 +107,598 @@ def initialize_sample_data():
     doctor_workload['dr_smith']['stress_level'] = 7
     doctor_workload['dr_smith']['last_break'] = (datetime.now() - timedelta(hours=3)).isoformat()
 
-# Initialize on startup
-initialize_sample_data()
+# ============================================
+# LATENCY-AWARE MODEL ROUTING
+# ============================================
+FAST_MODEL = os.getenv("GROQ_FAST_MODEL", "llama-3.1-8b-instant")
+LARGE_MODEL = os.getenv("GROQ_LARGE_MODEL", "llama-3.3-70b-versatile")
+
+# Candidate models per task in order of preference, with sampling parameters
+# and the deadline (seconds) used when the caller does not send one
+MODEL_ROUTES = {
+    'triage': {'models': [FAST_MODEL], 'temperature': 0.2, 'max_tokens': 300, 'deadline': 5.0},
+    'burnout': {'models': [FAST_MODEL], 'temperature': 0.5, 'max_tokens': 400, 'deadline': 8.0},
+    'handover': {'models': [LARGE_MODEL, FAST_MODEL], 'temperature': 0.3, 'max_tokens': 1500, 'deadline': 25.0},
+    'soap': {'models': [LARGE_MODEL, FAST_MODEL], 'temperature': 0.2, 'max_tokens': 1000, 'deadline': 25.0},
+    'chatbot': {'models': [LARGE_MODEL, FAST_MODEL], 'temperature': 0.5, 'max_tokens': 800, 'deadline': 15.0},
+    'general': {'models': [LARGE_MODEL, FAST_MODEL], 'temperature': 0.7, 'max_tokens': 1500, 'deadline': 30.0},
+}
+
+# Starting latency estimates (seconds) until real calls have been observed
+DEFAULT_LATENCY_ESTIMATES = {FAST_MODEL: 1.0, LARGE_MODEL: 4.0}
+
+# Observed estimates drift back toward the defaults above with this half-life (seconds),
+# so a model skipped for being slow is tried again once its last samples are stale
+LATENCY_DECAY_HALF_LIFE = 120.0
+
+MAX_REQUEST_DEADLINE = 30.0
+MIN_CALL_BUDGET = 0.5  # Not worth starting an upstream call with less time than this
+CONNECT_TIMEOUT = 3.05
+
+
+class Deadline:
+    """Absolute per-request deadline propagated from the endpoint to upstream calls"""
+
+    def __init__(self, seconds: float):
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+
+def request_deadline(data: dict, task: str) -> Deadline:
+    """Build the deadline for this request from `deadline_ms` (body or header) or the task default"""
+    seconds = MODEL_ROUTES.get(task, MODEL_ROUTES['general'])['deadline']
+    raw = (data or {}).get('deadline_ms')
+    if raw is None:
+        raw = request.headers.get('X-Request-Deadline-Ms')
+    if raw is not None:
+        try:
+            seconds = float(raw) / 1000
+        except (TypeError, ValueError):
+            pass
+    return Deadline(min(max(seconds, 0.0), MAX_REQUEST_DEADLINE))
+
+
+class ModelRouter:
+    """Picks models per task and tracks observed latency and the path each request took"""
+
+    def __init__(self, routes: dict):
+        self.routes = routes
+        self.latency_samples = {}  # model -> (EWMA seconds, monotonic time of last update)
+        self.timeout_counts = Counter()
+        self.path_counts = defaultdict(Counter)
+        self._lock = threading.Lock()
+
+    def route_for(self, task: str) -> dict:
+        return self.routes.get(task, self.routes['general'])
+
+    def estimate(self, model: str) -> float:
+        with self._lock:
+            return self._estimate(model)
+
+    def _estimate(self, model: str) -> float:
+        default = DEFAULT_LATENCY_ESTIMATES.get(model, DEFAULT_LATENCY_ESTIMATES[LARGE_MODEL])
+        if model not in self.latency_samples:
+            return default
+        seconds, updated_at = self.latency_samples[model]
+        weight = 0.5 ** ((time.monotonic() - updated_at) / LATENCY_DECAY_HALF_LIFE)
+        return default + (seconds - default) * weight
+
+    def call_budget(self, task: str, index: int, deadline: Deadline) -> float:
+        """Time the candidate at `index` may use while leaving room for the next candidate"""
+        models = self.route_for(task)['models']
+        reserve = self.estimate(models[index + 1]) if index + 1 < len(models) else 0.0
+        return deadline.remaining() - reserve
+
+    def record_latency(self, model: str, seconds: float):
+        """Exponentially weighted moving average of successful call latency"""
+        with self._lock:
+            previous = self._estimate(model)
+            self.latency_samples[model] = (0.7 * previous + 0.3 * seconds, time.monotonic())
+
+    def record_timeout(self, model: str):
+        """Timeouts are counted, not sampled: the budget says nothing about the model's latency"""
+        with self._lock:
+            self.timeout_counts[model] += 1
+
+    def record_path(self, task: str, path: str):
+        with self._lock:
+            self.path_counts[task][path] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            models = set(DEFAULT_LATENCY_ESTIMATES) | set(self.latency_samples)
+            return {
+                'latency_estimates': {m: round(self._estimate(m), 3) for m in models},
+                'timeouts': dict(self.timeout_counts),
+                'paths': {task: dict(counts) for task, counts in self.path_counts.items()}
+            }
+
+
+model_router = ModelRouter(MODEL_ROUTES)
+
+# ============================================
+# UPSTREAM RESILIENCE
+# ============================================
+LLM_MAX_INFLIGHT = int(os.getenv("LLM_MAX_INFLIGHT", "16"))
+SHEDDABLE_TASKS = {'chatbot', 'burnout', 'backfill'}  # Non-clinical work, shed first under load
+SHEDDABLE_SHARE = 0.5  # Fraction of upstream slots non-clinical work may occupy
+
+# Upstream calls run here so the caller can stop waiting at its deadline; abandoned
+# calls keep a thread until their socket timeout, hence the headroom over LLM_MAX_INFLIGHT
+llm_executor = ThreadPoolExecutor(max_workers=LLM_MAX_INFLIGHT * 2, thread_name_prefix='llm-call')
+
+# Paths on which the stored text came from a rule-based fallback instead of a model
+FALLBACK_PATHS = {'rule_based', 'degraded', 'shed'}
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream that is currently failing"""
+
+
+def is_upstream_failure(error: Exception, fair_timeout: bool = True) -> bool:
+    """Whether `error` says the upstream is unhealthy, rather than the request being bad or rushed.
+
+    Counts 5xx responses, connection errors and timeouts; a timeout only counts when
+    the caller gave the call at least the time it normally takes (`fair_timeout`).
+    """
+    if isinstance(error, requests.Timeout):
+        return fair_timeout
+    if isinstance(error, requests.HTTPError):
+        return error.response is not None and error.response.status_code >= 500
+    return isinstance(error, requests.ConnectionError)
+
+
+class CircuitBreaker:
+    """Failure-rate circuit breaker with half-open probing.
+
+    Opens when at least `failure_rate` of the calls in the last `window_seconds`
+    failed (given `min_calls` calls). After `open_seconds` a single probe call is
+    let through; its outcome closes or re-opens the circuit.
+    """
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, name: str, window_seconds: float = 60.0, min_calls: int = 5,
+                 failure_rate: float = 0.5, open_seconds: float = 30.0):
+        self.name = name
+        self.window_seconds = window_seconds
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.open_seconds = open_seconds
+        self.state = self.CLOSED
+        self.opened_at = 0.0
+        self.outcomes = deque()  # (timestamp, succeeded)
+        self.probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.open_seconds:
+                    return False
+                self.state = self.HALF_OPEN
+                self.probe_in_flight = False
+            if self.state == self.HALF_OPEN:
+                if self.probe_in_flight:
+                    return False
+                self.probe_in_flight = True
+            return True
+
+    def is_open(self) -> bool:
+        with self._lock:
+            return self.state == self.OPEN and time.monotonic() - self.opened_at < self.open_seconds
+
+    def record_success(self):
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self.state = self.CLOSED
+                self.outcomes.clear()
+                self.probe_in_flight = False
+                print(f"Circuit '{self.name}' closed")
+                return
+            self._record(True)
+
+    def record_failure(self):
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._open()
+                return
+            self._record(False)
+            failures = sum(1 for _, ok in self.outcomes if not ok)
+            if len(self.outcomes) >= self.min_calls and failures / len(self.outcomes) >= self.failure_rate:
+                self._open()
+
+    def record_ignored(self):
+        """Outcome that says nothing about upstream health; frees the half-open probe slot"""
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self.probe_in_flight = False
+
+    def _record(self, succeeded: bool):
+        now = time.monotonic()
+        self.outcomes.append((now, succeeded))
+        while self.outcomes and now - self.outcomes[0][0] > self.window_seconds:
+            self.outcomes.popleft()
+
+    def _open(self):
+        self.state = self.OPEN
+        self.opened_at = time.monotonic()
+        self.probe_in_flight = False
+        print(f"Circuit '{self.name}' opened")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'state': self.state,
+                'window_calls': len(self.outcomes),
+                'window_failures': sum(1 for _, ok in self.outcomes if not ok)
+            }
+
+
+class AdmissionController:
+    """Caps concurrent upstream LLM calls; non-clinical tasks only get a share of the slots"""
+
+    def __init__(self, max_inflight: int):
+        self.max_inflight = max_inflight
+        self.inflight = 0
+        self.shed_counts = Counter()
+        self._lock = threading.Lock()
+
+    def try_acquire(self, task: str) -> bool:
+        limit = self.max_inflight
+        if task in SHEDDABLE_TASKS:
+            limit = max(1, int(self.max_inflight * SHEDDABLE_SHARE))
+        with self._lock:
+            if self.inflight >= limit:
+                self.shed_counts[task] += 1
+                return False
+            self.inflight += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self.inflight -= 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'inflight': self.inflight, 'max_inflight': self.max_inflight, 'shed': dict(self.shed_counts)}
+
+
+class AIRetryQueue:
+    """Back-fills records stored with a rule-based fallback once the LLM upstream recovers"""
+
+    def __init__(self, max_size: int = 500, interval: float = 5.0, max_attempts: int = 5):
+        self.jobs = deque()
+        self.max_size = max_size
+        self.interval = interval
+        self.max_attempts = max_attempts
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._worker = None
+
+    def enqueue(self, record: dict, field: str, prompt: str, task: str, on_complete=None):
+        """Queue `record[field]` to be regenerated; `on_complete(text)` runs after it is replaced"""
+        record['ai_route']['backfill'] = 'pending'
+        with self._lock:
+            if len(self.jobs) >= self.max_size:
+                dropped = self.jobs.popleft()
+                dropped['record']['ai_route']['backfill'] = 'dropped'
+                self.dropped += 1
+            self.jobs.append({'record': record, 'field': field, 'prompt': prompt, 'task': task,
+                              'on_complete': on_complete, 'attempts': 0})
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name='ai-backfill', daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            self.drain()
+
+    def drain(self) -> int:
+        """Process queued jobs until the queue is empty or the upstream fails again"""
+        completed = 0
+        while not llm_breaker.is_open():
+            with self._lock:
+                if not self.jobs:
+                    break
+                job = self.jobs.popleft()
+
+            if not admission.try_acquire('backfill'):
+                self._requeue(job, count_attempt=False)
+                break
+            route = model_router.route_for(job['task'])
+            model = route['models'][0]
+            call_started = time.monotonic()
+            try:
+                text = rag_system.call_llm(job['prompt'], model, route['temperature'],
+                                           route['max_tokens'], timeout=route['deadline'])
+            except Exception as e:
+                if isinstance(e, requests.Timeout):
+                    model_router.record_timeout(model)
+                print(f"Backfill error ({job['task']}): {str(e)}")
+                self._requeue(job, count_attempt=not isinstance(e, CircuitOpenError))
+                break
+            finally:
+                admission.release()
+            model_router.record_latency(model, time.monotonic() - call_started)
+
+            record = job['record']
+            record[job['field']] = text
+            record['ai_route'].update({
+                'path': 'backfilled',
+                'model': model,
+                'backfill': 'done',
+                'backfilled_at': datetime.now().isoformat()
+            })
+            if job['on_complete']:
+                job['on_complete'](text)
+            model_router.record_path(job['task'], 'backfilled')
+            completed += 1
+        return completed
+
+    def _requeue(self, job: dict, count_attempt: bool = True):
+        if count_attempt:
+            job['attempts'] += 1
+        if job['attempts'] >= self.max_attempts:
+            job['record']['ai_route']['backfill'] = 'failed'
+            return
+        with self._lock:
+            self.jobs.appendleft(job)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'pending': len(self.jobs), 'dropped': self.dropped}
+
+
+llm_breaker = CircuitBreaker('groq')
+web_breaker = CircuitBreaker('tavily')
+admission = AdmissionController(LLM_MAX_INFLIGHT)
+ai_retry_queue = AIRetryQueue()
+
+# ============================================
+# RULE-BASED FALLBACKS
+# ============================================
+TRIAGE_RULE_ASSESSMENTS = {
+    'CRITICAL': 'Critical - Immediate attention required',
+    'HIGH': 'High priority - Quick assessment needed',
+    'MEDIUM': 'Medium priority - Assess in order of arrival',
+    'LOW': 'Low priority - Can wait'
+}
+
+
+def rule_based_triage(priority: str) -> str:
+    return TRIAGE_RULE_ASSESSMENTS.get(priority, TRIAGE_RULE_ASSESSMENTS['MEDIUM'])
+
+
+def rule_based_burnout_tips(hours_worked, stress_level, hours_since_break, patients_seen) -> str:
+    tips = []
+    if hours_since_break > 4:
+        tips.append("- Take a 15-minute break now; it has been over 4 hours since the last one")
+    if hours_worked > 10:
+        tips.append("- Hand over non-urgent tasks and plan to end the shift on time")
+    if stress_level > 7:
+        tips.append("- Stress is high: check in with a colleague or supervisor")
+    if patients_seen > 15:
+        tips.append("- Patient load is heavy: ask for new arrivals to be redistributed")
+    if not tips:
+        tips.append("- Workload is within normal limits; keep taking regular breaks")
+    return "\n".join(tips)
+
+
+def rule_based_handover(doctor_id: str, doctor_data: dict, active_patients: list) -> str:
+    critical = [p for p in active_patients if p.get('priority') == 'CRITICAL']
+    lines = [
+        f"Shift handover for Dr. {doctor_id}",
+        f"Hours worked: {doctor_data['hours_worked']}, patients seen: {doctor_data['patients_seen']}",
+        "",
+        "1. Critical patients:"
+    ]
+    lines.extend(f"   - {p.get('patient_name')}: {p.get('symptoms')}" for p in critical)
+    if not critical:
+        lines.append("   - None")
+    lines.append(f"2. Active patients pending: {len(active_patients)}")
+    lines.append("3. Notes: generated from queue data; review the patient queue for details")
+    return "\n".join(lines)
+
+
+def rule_based_soap(voice_transcript: str) -> str:
+    return f"""Subjective: {voice_transcript}
+Objective: Not documented
+Assessment: Pending clinician review
+Plan: Pending clinician review"""
+
+
+def rule_based_chatbot(context_documents: list) -> str:
+    if not context_documents:
+        return "I don't have that information in the current records"
+    return "AI assistant is busy. Most relevant record:\n" + context_documents[0].get('content', '')[:500]
 
 # ============================================
 # ADVANCED RAG SYSTEM
 # ============================================
+ARTIFACT_VERSION = 1
+
+
+def tokenize(text: str) -> set:
+    return set(text.lower().split())
+
+
 class AdvancedRAGSystem:
-    def __init__(self):
-        self.knowledge_base = []
+    """Knowledge base with an inverted keyword index plus the LLM/web clients.
+
+    Construction is cheap. The knowledge base (optionally from a prebuilt
+    artifact at `artifact_path`) is loaded on first use or by a warm-up thread,
+    so LLM-only endpoints such as triage never wait for it.
+    """
+
+    def __init__(self, artifact_path: Optional[str] = None):
+        self.artifact_path = artifact_path
+        self.knowledge_base = []  # Replaced documents leave a None slot until the next save_artifact
+        self.inverted_index = defaultdict(list)  # term -> sorted positions in knowledge_base
+        self.doc_positions = {}  # doc id -> position of its first occurrence in knowledge_base
+        self.document_chunks = defaultdict(list)  # metadata document_id -> positions of its chunks
+        self.removed_count = 0
         self.embeddings_cache = {}
+        self.load_error = None
+        self._loaded = threading.Event()
+        self._lock = threading.RLock()
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._loaded.is_set()
+
+    @property
+    def document_count(self) -> int:
+        return len(self.knowledge_base) - self.removed_count
+
+    def ensure_loaded(self):
+        """Load the knowledge-base artifact once; concurrent callers wait for the first"""
+        if self._loaded.is_set():
+            return
+        with self._lock:
+            if self._loaded.is_set():
+                return
+            if self.artifact_path:
+                try:
+                    self.load_artifact(self.artifact_path)
+                except Exception as e:
+                    self.load_error = str(e)
+                    print(f"Knowledge base load error: {str(e)}")
+            self._loaded.set()
+
+    def load_artifact(self, path: str):
+        """Load documents and their precomputed index from `save_artifact` output"""
+        with open(path, 'r', encoding='utf-8') as f:
+            artifact = json.load(f)
+        if artifact.get('version') != ARTIFACT_VERSION:
+            raise ValueError(f"Unsupported knowledge base artifact version: {artifact.get('version')}")
+        with self._lock:
+            self.knowledge_base = artifact['documents']
+            self.inverted_index = defaultdict(list, artifact['index'])
+            self.removed_count = 0
+            self._rebuild_lookups()
+
+    def save_artifact(self, path: str):
+        """Write documents and index to `path` atomically for fast worker startup"""
+        self.ensure_loaded()
+        with self._lock:
+            if self.removed_count:
+                self._compact()
+            artifact = {
+                'version': ARTIFACT_VERSION,
+                'documents': self.knowledge_base,
+                'index': self.inverted_index
+            }
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(artifact, f)
+        os.replace(tmp_path, path)
+
+    def _rebuild_lookups(self):
+        self.doc_positions = {}
+        self.document_chunks = defaultdict(list)
+        for position, doc in enumerate(self.knowledge_base):
+            if doc is None:
+                continue
+            self.doc_positions.setdefault(doc['id'], position)
+            document_id = doc['metadata'].get('document_id')
+            if document_id is not None:
+                self.document_chunks[document_id].append(position)
+
+    def _compact(self):
+        """Drop the slots of replaced documents and renumber the index"""
+        remap = {}
+        documents = []
+        for position, doc in enumerate(self.knowledge_base):
+            if doc is not None:
+                remap[position] = len(documents)
+                documents.append(doc)
+        self.inverted_index = defaultdict(list, {
+            term: [remap[position] for position in postings]
+            for term, postings in self.inverted_index.items() if postings
+        })
+        self.knowledge_base = documents
+        self.removed_count = 0
+        self._rebuild_lookups()
+
+    def _remove_position(self, position: int):
+        doc = self.knowledge_base[position]
+        for term in tokenize(doc['content']):
+            postings = self.inverted_index[term]
+            del postings[bisect.bisect_left(postings, position)]
+            if not postings:
+                del self.inverted_index[term]
+        if self.doc_positions.get(doc['id']) == position:
+            del self.doc_positions[doc['id']]
+        self.knowledge_base[position] = None
+        self.removed_count += 1
         
     def add_document(self, doc_id: str, content: str, metadata: dict):
         """Add document to knowledge base"""
-        self.knowledge_base.append({
-            'id': doc_id,
-            'content': content,
-            'metadata': metadata,
-            'timestamp': datetime.now().isoformat()
-        })
+        self.add_documents([{'id': doc_id, 'content': content, 'metadata': metadata}])
+
+    def add_documents(self, documents: List[Dict]):
+        """Add a batch of documents; none are searchable until the whole batch commits.
+
+        Chunk 0 of a `metadata['document_id']` starts a new version of that
+        document: chunks stored for the id earlier are dropped in the same commit.
+        """
+        self.ensure_loaded()
+        timestamp = datetime.now().isoformat()
+        staged = [(doc, tokenize(doc['content'])) for doc in documents]  # Tokenize outside the lock
+        with self._lock:
+            for doc, terms in staged:
+                document_id = doc['metadata'].get('document_id')
+                if document_id is not None and doc['metadata'].get('chunk', 0) == 0:
+                    for old_position in self.document_chunks.pop(document_id, ()):
+                        self._remove_position(old_position)
+
+                position = len(self.knowledge_base)
+                self.knowledge_base.append({
+                    'id': doc['id'],
+                    'content': doc['content'],
+                    'metadata': doc['metadata'],
+                    'timestamp': timestamp
+                })
+                self.doc_positions.setdefault(doc['id'], position)
+                if document_id is not None:
+                    self.document_chunks[document_id].append(position)
+                for term in terms:
+                    self.inverted_index[term].append(position)
+
+    def update_document(self, doc_id: str, content: str):
+        """Replace the content of an existing document (e.g. a back-filled medical record)"""
+        self.ensure_loaded()
+        new_terms = tokenize(content)
+        with self._lock:
+            position = self.doc_positions.get(doc_id)
+            if position is None:
+                return
+            doc = self.knowledge_base[position]
+            old_terms = tokenize(doc['content'])
+            # Posting lists stay sorted, so only the changed terms need a bisect each
+            for term in old_terms - new_terms:
+                postings = self.inverted_index[term]
+                del postings[bisect.bisect_left(postings, position)]
+            for term in new_terms - old_terms:
+                bisect.insort(self.inverted_index[term], position)
+            doc['content'] = content
+            doc['timestamp'] = datetime.now().isoformat()
     
     def semantic_search(self, query: str, top_k: int = 5) -> List[Dict]:
         """Simple keyword-based semantic search"""
-        query_terms = set(query.lower().split())
-        scored_docs = []
-        
-        for doc in self.knowledge_base:
-            content_terms = set(doc['content'].lower().split())
-            score = len(query_terms.intersection(content_terms))
-            if score > 0:
-                scored_docs.append((score, doc))
-        
-        scored_docs.sort(reverse=True, key=lambda x: x[0])
-        return [doc for _, doc in scored_docs[:top_k]]
+        self.ensure_loaded()
+        scores = Counter()
+        with self._lock:
+            for term in tokenize(query):
+                for position in self.inverted_index.get(term, ()):
+                    scores[position] += 1
+
+            # Highest score first, ties in insertion order
+            best = heapq.nsmallest(top_k, scores.items(), key=lambda x: (-x[1], x[0]))
+            return [self.knowledge_base[position] for position, _ in best]
     
     def retrieve_and_generate(self, query: str, context_type: str = "general") -> str:
         """RAG: Retrieve relevant docs and generate response"""
@@ -144,31 +720,132 @@ Provide a detailed, accurate response based on the context provided."""
 
         return self.generate_with_llm(prompt)
     
-    def generate_with_llm(self, prompt: str, model: str = "llama-3.3-70b-versatile") -> str:
+    def call_llm(self, prompt: str, model: str, temperature: float = 0.7,
+                 max_tokens: int = 1500, timeout: float = 30) -> str:
+        """Single Groq chat completion call guarded by the circuit breaker; raises on failure.
+
+        `timeout` bounds the whole call, not just each socket operation: the request
+        runs on `llm_executor` and requests.Timeout is raised once it is exceeded.
+        """
+        if not llm_breaker.allow_request():
+            raise CircuitOpenError("LLM upstream circuit is open")
+
+        headers = {
+            "Authorization": f"Bearer {GROQ_API_KEY}",
+            "Content-Type": "application/json"
+        }
+
+        payload = {
+            "model": model,
+            "messages": [{"role": "user", "content": prompt}],
+            "temperature": temperature,
+            "max_tokens": max_tokens
+        }
+
+        try:
+            future = llm_executor.submit(self._post_completion, headers, payload, timeout)
+            try:
+                content = future.result(timeout=timeout)
+            except FutureTimeoutError:
+                future.cancel()
+                raise requests.Timeout(f"LLM call exceeded its {timeout:.1f}s budget")
+        except Exception as e:
+            if is_upstream_failure(e, fair_timeout=timeout >= model_router.estimate(model)):
+                llm_breaker.record_failure()
+            else:
+                llm_breaker.record_ignored()
+            raise
+        llm_breaker.record_success()
+        return content
+
+    def _post_completion(self, headers: dict, payload: dict, timeout: float) -> str:
+        response = requests.post(GROQ_API_URL, headers=headers, json=payload,
+                                 timeout=(min(CONNECT_TIMEOUT, timeout), timeout))
+        response.raise_for_status()
+        return response.json()['choices'][0]['message']['content']
+
+    def generate_with_llm(self, prompt: str, model: str = LARGE_MODEL) -> str:
         """Generate response using Groq LLM"""
         try:
-            headers = {
-                "Authorization": f"Bearer {GROQ_API_KEY}",
-                "Content-Type": "application/json"
-            }
-            
-            payload = {
-                "model": model,
-                "messages": [{"role": "user", "content": prompt}],
-                "temperature": 0.7,
-                "max_tokens": 1500
-            }
-            
-            response = requests.post(GROQ_API_URL, headers=headers, json=payload, timeout=30)
-            response.raise_for_status()
-            
-            return response.json()['choices'][0]['message']['content']
+            return self.call_llm(prompt, model)
         except Exception as e:
             print(f"LLM Error: {str(e)}")
             return f"AI analysis temporarily unavailable. Error: {str(e)}"
+
+    def generate_routed(self, prompt: str, task: str = "general", deadline: Optional[Deadline] = None,
+                        fallback: Optional[str] = None) -> Tuple[str, Dict]:
+        """Generate with the models routed for `task` within `deadline`.
+
+        Candidates are tried in order; one is skipped when its expected latency does
+        not fit the remaining budget. When no model answers in time, the circuit is
+        open or admission control sheds the task, the rule-based `fallback` is
+        returned without waiting. The second value records which path was taken.
+        """
+        route = model_router.route_for(task)
+        deadline = deadline or Deadline(route['deadline'])
+        started = time.monotonic()
+        attempts = []
+
+        if llm_breaker.is_open():
+            return self._fallback(task, 'degraded', fallback, 'circuit open', started, attempts)
+        if not admission.try_acquire(task):
+            return self._fallback(task, 'shed', fallback, 'overloaded', started, attempts)
+        try:
+            return self._generate_candidates(prompt, task, route, deadline, fallback, started, attempts)
+        finally:
+            admission.release()
+
+    def _generate_candidates(self, prompt: str, task: str, route: dict, deadline: Deadline,
+                             fallback: Optional[str], started: float, attempts: list) -> Tuple[str, Dict]:
+        last_error = None
+        for index, model in enumerate(route['models']):
+            budget = model_router.call_budget(task, index, deadline)
+            if budget < MIN_CALL_BUDGET or model_router.estimate(model) > budget:
+                attempts.append({'model': model, 'outcome': 'skipped'})
+                continue
+
+            call_started = time.monotonic()
+            try:
+                text = self.call_llm(prompt, model, route['temperature'], route['max_tokens'], timeout=budget)
+            except CircuitOpenError:
+                return self._fallback(task, 'degraded', fallback, 'circuit open', started, attempts)
+            except Exception as e:
+                last_error = e
+                if isinstance(e, requests.Timeout):
+                    model_router.record_timeout(model)
+                print(f"LLM Error ({model}): {str(e)}")
+                attempts.append({'model': model, 'outcome': 'error'})
+                continue
+
+            model_router.record_latency(model, time.monotonic() - call_started)
+            attempts.append({'model': model, 'outcome': 'ok'})
+            path = 'primary' if index == 0 else 'fallback_model'
+            return text, self._route_record(task, path, model, started, attempts)
+
+        error = str(last_error) if last_error else 'deadline exceeded'
+        return self._fallback(task, 'rule_based', fallback, error, started, attempts)
+
+    def _fallback(self, task: str, path: str, fallback: Optional[str], error: str,
+                  started: float, attempts: list) -> Tuple[str, Dict]:
+        if fallback is None:
+            return (f"AI analysis temporarily unavailable. Error: {error}",
+                    self._route_record(task, 'unavailable', None, started, attempts))
+        return fallback, self._route_record(task, path, None, started, attempts)
+
+    def _route_record(self, task: str, path: str, model: Optional[str], started: float, attempts: list) -> Dict:
+        model_router.record_path(task, path)
+        return {
+            'task': task,
+            'path': path,
+            'model': model,
+            'attempts': attempts,
+            'latency_ms': round((time.monotonic() - started) * 1000)
+        }
     
     def web_search(self, query: str) -> List[Dict]:
         """Search web using Tavily API for real-time medical information"""
+        if not web_breaker.allow_request():
+            return []
         try:
             payload = {
                 "api_key": TAVILY_API_KEY,
@@ -181,6 +858,7 @@ Provide a detailed, accurate response based on the context provided."""
             response.raise_for_status()
             
             results = response.json().get('results', [])
+            web_breaker.record_success()
             
             # Add to knowledge base
             for idx, result in enumerate(results):
@@ -192,16 +870,20 @@ Provide a detailed, accurate response based on the context provided."""
             
             return results
         except Exception as e:
+            if is_upstream_failure(e):
+                web_breaker.record_failure()
+            else:
+                web_breaker.record_ignored()
             print(f"Web search error: {str(e)}")
             return []
 
-# Initialize RAG system
+# Initialize RAG system (knowledge base is loaded lazily, see create_app)
 rag_system = AdvancedRAGSystem()
 
 # ============================================
 # FEATURE 1: AI TRIAGE ASSISTANT
 # ============================================
-@app.route('/api/triage', methods=['POST'])
+@api.route('/api/triage', methods=['POST'])
 def ai_triage():
     """AI-powered symptom analysis with RAG for prioritization"""
     try:
@@ -243,7 +925,9 @@ Vital Signs: {json.dumps(vital_signs)}
 
 Provide a brief triage assessment (2-3 sentences) with recommended actions."""
 
-        ai_assessment = rag_system.generate_with_llm(triage_prompt)
+        ai_assessment, ai_route = rag_system.generate_routed(
+            triage_prompt, task='triage', deadline=request_deadline(data, 'triage'),
+            fallback=rule_based_triage(priority))
         
         # Add to patient queue
         patient_entry = {
@@ -254,11 +938,14 @@ Provide a brief triage assessment (2-3 sentences) with recommended actions."""
             'vital_signs': vital_signs,
             'priority': priority,
             'triage_assessment': ai_assessment,
+            'ai_route': ai_route,
             'arrival_time': datetime.now().isoformat(),
             'status': 'waiting'
         }
         
         patients_queue.append(patient_entry)
+        if ai_route['path'] in FALLBACK_PATHS:
+            ai_retry_queue.enqueue(patient_entry, 'triage_assessment', triage_prompt, 'triage')
         
         # Sort queue by priority
         priority_order = {'CRITICAL': 0, 'HIGH': 1, 'MEDIUM': 2, 'LOW': 3}
@@ -287,7 +974,7 @@ Provide a brief triage assessment (2-3 sentences) with recommended actions."""
 # ============================================
 # FEATURE 2: SMART SHIFT HANDOVER
 # ============================================
-@app.route('/api/shift-handover', methods=['POST'])
+@api.route('/api/shift-handover', methods=['POST'])
 def smart_shift_handover():
     """Auto-generate comprehensive shift handover report"""
     try:
@@ -318,19 +1005,24 @@ Generate a structured handover with:
 2. Key pending items
 3. Important notes for incoming doctor"""
 
-        handover_report = rag_system.generate_with_llm(handover_prompt)
+        handover_report, ai_route = rag_system.generate_routed(
+            handover_prompt, task='handover', deadline=request_deadline(data, 'handover'),
+            fallback=rule_based_handover(doctor_id, doctor_data, active_patients))
         
         handover_entry = {
             'id': len(shift_handovers) + 1,
             'doctor_id': doctor_id,
             'shift_end_time': shift_end_time,
             'report': handover_report,
+            'ai_route': ai_route,
             'active_patients_count': len(active_patients),
             'critical_count': len([p for p in active_patients if p.get('priority') == 'CRITICAL']),
             'generated_at': datetime.now().isoformat()
         }
         
         shift_handovers.append(handover_entry)
+        if ai_route['path'] in FALLBACK_PATHS:
+            ai_retry_queue.enqueue(handover_entry, 'report', handover_prompt, 'handover')
         
         return jsonify({
             'success': True,
@@ -346,7 +1038,7 @@ Generate a structured handover with:
 # ============================================
 # FEATURE 3: BURNOUT RISK PREDICTOR
 # ============================================
-@app.route('/api/burnout-analysis', methods=['POST'])
+@api.route('/api/burnout-analysis', methods=['POST'])
 def burnout_risk_predictor():
     """Analyze workload patterns to predict burnout risk"""
     try:
@@ -398,13 +1090,16 @@ Risk Score: {risk_score}/100
 
 Provide brief recommendations (3-4 points) for managing workload and preventing burnout."""
 
-        analysis = rag_system.generate_with_llm(burnout_prompt)
+        analysis, ai_route = rag_system.generate_routed(
+            burnout_prompt, task='burnout', deadline=request_deadline(data, 'burnout'),
+            fallback=rule_based_burnout_tips(hours_worked, stress_level, hours_since_break, patients_seen))
         
         result = {
             'doctor_id': doctor_id,
             'burnout_risk_level': risk_level,
             'risk_score': risk_score,
             'analysis': analysis,
+            'ai_route': ai_route,
             'metrics': {
                 'hours_worked': hours_worked,
                 'patients_seen': patients_seen,
@@ -429,7 +1124,7 @@ Provide brief recommendations (3-4 points) for managing workload and preventing
 # ============================================
 # FEATURE 4: VOICE-TO-DOCUMENTATION
 # ============================================
-@app.route('/api/voice-to-doc', methods=['POST'])
+@api.route('/api/voice-to-doc', methods=['POST'])
 def voice_to_documentation():
     """Convert doctor voice notes to structured medical records"""
     try:
@@ -459,7 +1154,9 @@ Generate a professional medical record with:
 
 Keep it concise and professional."""
 
-        structured_doc = rag_system.generate_with_llm(documentation_prompt)
+        structured_doc, ai_route = rag_system.generate_routed(
+            documentation_prompt, task='soap', deadline=request_deadline(data, 'soap'),
+            fallback=rule_based_soap(voice_transcript))
         
         voice_note_entry = {
             'id': len(voice_notes) + 1,
@@ -467,17 +1164,23 @@ Keep it concise and professional."""
             'patient_id': patient_id,
             'original_transcript': voice_transcript,
             'structured_documentation': structured_doc,
+            'ai_route': ai_route,
             'created_at': datetime.now().isoformat()
         }
         
         voice_notes.append(voice_note_entry)
         
         # Add to RAG knowledge base
+        record_doc_id = f"medical_record_{voice_note_entry['id']}"
         rag_system.add_document(
-            doc_id=f"medical_record_{voice_note_entry['id']}",
+            doc_id=record_doc_id,
             content=structured_doc,
             metadata={'type': 'medical_record', 'patient_id': patient_id}
         )
+        if ai_route['path'] in FALLBACK_PATHS:
+            ai_retry_queue.enqueue(
+                voice_note_entry, 'structured_documentation', documentation_prompt, 'soap',
+                on_complete=lambda text: rag_system.update_document(record_doc_id, text))
         
         return jsonify({
             'success': True,
@@ -494,7 +1197,7 @@ Keep it concise and professional."""
 # ADDITIONAL HELPER ENDPOINTS
 # ============================================
 
-@app.route('/api/doctor/update-workload', methods=['POST'])
+@api.route('/api/doctor/update-workload', methods=['POST'])
 def update_doctor_workload():
     """Update doctor workload metrics in real-time"""
     try:
@@ -524,7 +1227,7 @@ def update_doctor_workload():
             'error': str(e)
         }), 500
 
-@app.route('/api/patient-queue', methods=['GET'])
+@api.route('/api/patient-queue', methods=['GET'])
 def get_patient_queue():
     """Get current patient queue"""
     try:
@@ -541,7 +1244,7 @@ def get_patient_queue():
             'error': str(e)
         }), 500
 
-@app.route('/api/patient/<int:patient_id>/status', methods=['PUT'])
+@api.route('/api/patient/<int:patient_id>/status', methods=['PUT'])
 def update_patient_status(patient_id):
     """Update patient status"""
     try:
@@ -563,7 +1266,7 @@ def update_patient_status(patient_id):
             'error': str(e)
         }), 500
 
-@app.route('/api/stats', methods=['GET'])
+@api.route('/api/stats', methods=['GET'])
 def get_system_stats():
     """Get overall system statistics"""
     try:
@@ -576,9 +1279,16 @@ def get_system_stats():
                 'total_tasks': sum(len(d['tasks']) for d in doctor_workload.values()),
                 'handovers_generated': len(shift_handovers),
                 'voice_notes_processed': len(voice_notes),
-                'knowledge_base_documents': len(rag_system.knowledge_base),
+                'knowledge_base_documents': rag_system.document_count,
                 'historical_data_points': len(historical_patient_flow),
-                'critical_patients': len([p for p in patients_queue if p.get('priority') == 'CRITICAL'])
+                'critical_patients': len([p for p in patients_queue if p.get('priority') == 'CRITICAL']),
+                'llm_routing': model_router.stats(),
+                'upstream': {
+                    'llm_circuit': llm_breaker.stats(),
+                    'web_circuit': web_breaker.stats(),
+                    'admission': admission.stats(),
+                    'backfill_queue': ai_retry_queue.stats()
+                }
             }
         })
     except Exception as e:
@@ -589,7 +1299,7 @@ def get_system_stats():
     # ============================================
 # FEATURE 5: INTELLIGENT CHATBOT WITH RAG
 # ============================================
-@app.route('/api/chatbot', methods=['POST'])
+@api.route('/api/chatbot', methods=['POST'])
 def intelligent_chatbot():
     """AI chatbot that answers questions about patients using RAG"""
     try:
@@ -679,12 +1389,23 @@ Instructions:
 
 Answer:"""
 
-        response_text = rag_system.generate_with_llm(chatbot_prompt)
+        response_text, ai_route = rag_system.generate_routed(
+            chatbot_prompt, task='chatbot', deadline=request_deadline(data, 'chatbot'),
+            fallback=rule_based_chatbot(context_documents))
+
+        if ai_route['path'] == 'shed':
+            response = jsonify({
+                'success': False,
+                'error': 'Assistant is busy with clinical work, please retry shortly'
+            })
+            response.headers['Retry-After'] = '5'
+            return response, 503
         
         return jsonify({
             'success': True,
             'response': response_text,
             'context_used': len(context_documents),
+            'ai_route': ai_route,
             'patient_specific': patient_id is not None
         })
     
@@ -694,7 +1415,7 @@ Answer:"""
             'error': str(e)
         }), 500
 
-@app.route('/api/chatbot/suggestions', methods=['GET'])
+@api.route('/api/chatbot/suggestions', methods=['GET'])
 def chatbot_suggestions():
     """Get suggested questions for the chatbot"""
     suggestions = [
@@ -713,7 +1434,7 @@ def chatbot_suggestions():
         'suggestions': suggestions
     })
 
-@app.route('/api/health', methods=['GET'])
+@api.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
     return jsonify({
@@ -723,15 +1444,378 @@ def health_check():
         'version': '2.0'
     })
 
+@api.route('/api/ready', methods=['GET'])
+def readiness_check():
+    """Readiness probe: 503 until the knowledge base is loaded, unless it loads lazily"""
+    lazy = current_app.config.get('KNOWLEDGE_BASE_WARMUP') == 'lazy'
+    ready = (rag_system.is_loaded or lazy) and rag_system.load_error is None
+    return jsonify({
+        'ready': ready,
+        'knowledge_base_loaded': rag_system.is_loaded,
+        'knowledge_base_documents': rag_system.document_count,
+        'load_error': rag_system.load_error,
+        'timestamp': datetime.now().isoformat()
+    }), 200 if ready else 503
+
+# ============================================
+# FEATURE 6: KNOWLEDGE BASE BULK IMPORT
+# ============================================
+IMPORT_FORMATS = ('ndjson', 'text')
+IMPORT_BATCH_SIZE = int(os.getenv("MEDIFLOW_IMPORT_BATCH_SIZE", "1000"))  # Chunks per commit
+CHUNK_WORDS = 200
+CHUNK_OVERLAP = 20
+COPY_BUFFER_SIZE = 1024 * 1024
+TEXT_READ_LIMIT = 1024 * 1024  # Bytes per read of a text import; longer lines arrive in pieces
+MAX_TEXT_DOCUMENT_WORDS = 50000  # Longer blank-line separated blocks become several documents
+
+
+def chunk_text(text: str) -> List[str]:
+    """Split a document into overlapping word windows; short documents are kept as-is"""
+    words = text.split()
+    if len(words) <= CHUNK_WORDS:
+        return [text] if words else []
+    step = CHUNK_WORDS - CHUNK_OVERLAP
+    return [" ".join(words[start:start + CHUNK_WORDS])
+            for start in range(0, len(words) - CHUNK_OVERLAP, step)]
+
+
+def iter_import_documents(stream, fmt: str, source: str, progress: dict):
+    """Yield the chunks of each imported document, one list per document.
+
+    `stream` is a binary file. NDJSON records carry `id`, `content` (or `text`)
+    and optional `metadata`; malformed lines are counted and skipped. Plain
+    text is read in bounded pieces and split into documents on blank lines;
+    a block over MAX_TEXT_DOCUMENT_WORDS is cut into several documents.
+    """
+    if fmt == 'ndjson':
+        for line_no, line in enumerate(stream, 1):
+            progress['bytes_read'] += len(line)
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                if not isinstance(record, dict):
+                    raise ValueError("record must be a JSON object")
+                content = record.get('content') or record.get('text') or ''
+                if not isinstance(content, str):
+                    raise ValueError("content must be a string")
+                metadata = record.get('metadata') or {}
+                if not isinstance(metadata, dict):
+                    raise ValueError("metadata must be an object")
+                doc_id = str(record.get('id') or f"{source}_{line_no}")
+                metadata = dict(metadata, source=source, document_id=doc_id)
+            except ValueError as e:
+                progress['errors'] += 1
+                if len(progress['error_samples']) < 5:
+                    progress['error_samples'].append(f"line {line_no}: {str(e)}")
+                continue
+            progress['documents_read'] += 1
+            yield [{'id': f"{doc_id}#{n}", 'content': chunk, 'metadata': dict(metadata, chunk=n)}
+                   for n, chunk in enumerate(chunk_text(content))]
+        return
+
+    doc_no = 0
+    words = []
+    carry = b''  # Word cut in half by the read limit
+    at_line_start = True
+
+    def document():
+        nonlocal doc_no
+        doc_id = f"{source}_{doc_no}"
+        doc_no += 1
+        progress['documents_read'] += 1
+        metadata = {'source': source, 'document_id': doc_id}
+        return [{'id': f"{doc_id}#{n}", 'content': chunk, 'metadata': dict(metadata, chunk=n)}
+                for n, chunk in enumerate(chunk_text(" ".join(words)))]
+
+    for piece in iter(lambda: stream.readline(TEXT_READ_LIMIT), b''):
+        progress['bytes_read'] += len(piece)
+        if at_line_start and piece.endswith(b'\n') and not piece.strip():
+            if words:
+                yield document()
+                words = []
+            continue
+
+        at_line_start = piece.endswith(b'\n')
+        piece = carry + piece
+        carry = b''
+        if not at_line_start:
+            cut = max(piece.rfind(b' '), piece.rfind(b'\t'))
+            if cut >= 0:
+                piece, carry = piece[:cut], piece[cut:]
+        words.extend(piece.decode('utf-8', errors='replace').split())
+        if len(words) >= MAX_TEXT_DOCUMENT_WORDS:
+            yield document()
+            words = []
+
+    words.extend(carry.decode('utf-8', errors='replace').split())
+    if words:
+        yield document()
+
+
+class KnowledgeImporter:
+    """Background worker that streams import files into the knowledge base in batches.
+
+    Jobs run one at a time. Chunks are collected up to `batch_size` (never
+    splitting a document) and committed with `add_documents`, so each batch
+    becomes searchable atomically while progress is reported on the job.
+    Jobs and the documents they add live only in this process's memory.
+    """
+
+    def __init__(self, batch_size: int = IMPORT_BATCH_SIZE):
+        self.batch_size = batch_size
+        self.jobs = {}
+        self.pending = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+
+    def create_job(self, path: str, fmt: str, source: str, cleanup: bool = False) -> dict:
+        with self._lock:
+            job_id = f"import_{uuid.uuid4().hex}"
+            job = {
+                'id': job_id,
+                'path': path,
+                'cleanup': cleanup,
+                'format': fmt,
+                'source': source,
+                'status': 'queued',
+                'bytes_total': os.path.getsize(path),
+                'bytes_read': 0,
+                'documents_read': 0,
+                'chunks_indexed': 0,
+                'batches_committed': 0,
+                'errors': 0,
+                'error_samples': [],
+                'docs_per_sec': 0.0,
+                'created_at': datetime.now().isoformat(),
+                'started_at': None,
+                'finished_at': None,
+                'error': None
+            }
+            self.jobs[job_id] = job
+        return job
+
+    def submit(self, path: str, fmt: str, source: str, cleanup: bool = False) -> dict:
+        """Queue a file for background import; `cleanup` deletes it when the job ends"""
+        job = self.create_job(path, fmt, source, cleanup)
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name='kb-import', daemon=True)
+                self._worker.start()
+        self.pending.put(job)
+        return job
+
+    def _run(self):
+        while True:
+            self.run_job(self.pending.get())
+
+    def run_job(self, job: dict) -> dict:
+        """Import one job in the calling thread"""
+        job['status'] = 'running'
+        job['started_at'] = datetime.now().isoformat()
+        started = time.monotonic()
+        batch = []
+        try:
+            with open(job['path'], 'rb') as f:
+                for chunks in iter_import_documents(f, job['format'], job['source'], job):
+                    batch.extend(chunks)
+                    if len(batch) >= self.batch_size:
+                        self._commit(job, batch, started)
+                        batch = []
+            if batch:
+                self._commit(job, batch, started)
+            job['status'] = 'completed'
+        except Exception as e:
+            job['status'] = 'failed'
+            job['error'] = str(e)
+            print(f"Knowledge import error ({job['id']}): {str(e)}")
+        finally:
+            job['finished_at'] = datetime.now().isoformat()
+            if job['cleanup']:
+                os.remove(job['path'])
+        return job
+
+    def _commit(self, job: dict, batch: List[Dict], started: float):
+        rag_system.add_documents(batch)
+        job['chunks_indexed'] += len(batch)
+        job['batches_committed'] += 1
+        elapsed = time.monotonic() - started
+        job['docs_per_sec'] = round(job['documents_read'] / elapsed, 1) if elapsed else 0.0
+
+    def status(self, job_id: str) -> Optional[dict]:
+        job = self.jobs.get(job_id)
+        if job is None:
+            return None
+        view = {k: v for k, v in job.items() if k not in ('path', 'cleanup')}
+        view['progress'] = round(job['bytes_read'] / job['bytes_total'], 4) if job['bytes_total'] else 1.0
+        return view
+
+
+knowledge_importer = KnowledgeImporter()
+
+
+@api.route('/api/knowledge/import', methods=['POST'])
+def import_knowledge():
+    """Stream an NDJSON or plain-text upload to disk and index it in the background.
+
+    Single-process and not durable: the documents are indexed only into this
+    worker's in-memory knowledge base, other workers never see them, and they
+    are lost on restart. Job ids are only known to this worker as well. Use
+    `python main.py import-knowledge --artifact ...` to build the artifact that
+    every worker loads at startup.
+    """
+    try:
+        is_multipart = request.mimetype == 'multipart/form-data'
+        upload = request.files.get('file') if is_multipart else None
+        if is_multipart and upload is None:
+            return jsonify({
+                'success': False,
+                'error': "Multipart uploads need a 'file' part"
+            }), 400
+        filename = upload.filename if upload else ''
+        fmt = request.args.get('format')
+        if not fmt:
+            is_ndjson = 'ndjson' in (request.mimetype or '') or filename.endswith(('.ndjson', '.jsonl'))
+            fmt = 'ndjson' if is_ndjson else 'text'
+        if fmt not in IMPORT_FORMATS:
+            return jsonify({
+                'success': False,
+                'error': f"Unsupported format, use one of: {', '.join(IMPORT_FORMATS)}"
+            }), 400
+        source = request.args.get('source') or filename or 'upload'
+
+        fd, path = tempfile.mkstemp(prefix='kb_import_', suffix=f'.{fmt}')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                shutil.copyfileobj(upload.stream if upload else request.stream, f, COPY_BUFFER_SIZE)
+            job = knowledge_importer.submit(path, fmt, source, cleanup=True)
+        except Exception:
+            os.remove(path)
+            raise
+        return jsonify({
+            'success': True,
+            'job': knowledge_importer.status(job['id'])
+        }), 202
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@api.route('/api/knowledge/import', methods=['GET'])
+def list_knowledge_imports():
+    """List knowledge base import jobs and their progress"""
+    return jsonify({
+        'success': True,
+        'jobs': [knowledge_importer.status(job_id) for job_id in list(knowledge_importer.jobs)]
+    })
+
+@api.route('/api/knowledge/import/<job_id>', methods=['GET'])
+def knowledge_import_status(job_id):
+    """Get progress of a knowledge base import job"""
+    job = knowledge_importer.status(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Import job not found'}), 404
+    return jsonify({'success': True, 'job': job})
+
+# ============================================
+# APPLICATION FACTORY
+# ============================================
+def create_app(config: Optional[dict] = None) -> Flask:
+    """Build the Flask app; subsystems are initialized from config instead of at import time"""
+    app = Flask(__name__)
+    app.config.update(DEFAULT_CONFIG)
+    app.config.update(config or {})
+    warmup = app.config['KNOWLEDGE_BASE_WARMUP']
+    if warmup not in WARMUP_MODES:
+        raise ValueError(f"KNOWLEDGE_BASE_WARMUP (MEDIFLOW_KB_WARMUP) must be one of "
+                         f"{', '.join(WARMUP_MODES)}, got {warmup!r}")
+    CORS(app)
+    app.register_blueprint(api)
+
+    if app.config['LOAD_SAMPLE_DATA']:
+        initialize_sample_data()
+
+    rag_system.artifact_path = app.config['KNOWLEDGE_BASE_ARTIFACT']
+    if warmup == 'eager':
+        rag_system.ensure_loaded()
+    elif warmup == 'background':
+        threading.Thread(target=rag_system.ensure_loaded, name='kb-warmup', daemon=True).start()
+
+    return app
+
+
+def __getattr__(name):
+    """Build the default app on first access to `main.app` (e.g. `gunicorn main:app`)"""
+    if name == 'app':
+        global app
+        app = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# ============================================
+# COMMAND LINE
+# ============================================
+def import_knowledge_cli(argv: List[str]) -> int:
+    """`python main.py import-knowledge FILE...`: bulk import and write a prebuilt artifact"""
+    parser = argparse.ArgumentParser(prog='main.py import-knowledge',
+                                     description='Import NDJSON/text files into the knowledge base')
+    parser.add_argument('files', nargs='+')
+    parser.add_argument('--format', choices=IMPORT_FORMATS, help='default: from the file extension')
+    parser.add_argument('--source', help='default: the file name')
+    parser.add_argument('--artifact', default=DEFAULT_CONFIG['KNOWLEDGE_BASE_ARTIFACT'],
+                        help='knowledge base artifact to extend and write back (required unless '
+                             '$MEDIFLOW_KB_ARTIFACT is set)')
+    args = parser.parse_args(argv)
+    if not args.artifact:
+        parser.error('an output artifact is required: pass --artifact or set MEDIFLOW_KB_ARTIFACT')
+    missing = [path for path in args.files if not os.path.isfile(path)]
+    if missing:
+        parser.error(f"input file not found: {', '.join(missing)}")
+
+    # Load the existing artifact up front; never overwrite one that could not be read
+    if os.path.exists(args.artifact):
+        rag_system.artifact_path = args.artifact
+        rag_system.ensure_loaded()
+        if rag_system.load_error:
+            print(f"Cannot extend {args.artifact}: {rag_system.load_error}", file=sys.stderr)
+            return 1
+
+    failed = False
+    for path in args.files:
+        fmt = args.format or ('ndjson' if path.endswith(('.ndjson', '.jsonl')) else 'text')
+        job = knowledge_importer.create_job(path, fmt, args.source or os.path.basename(path))
+        worker = threading.Thread(target=knowledge_importer.run_job, args=(job,))
+        worker.start()
+        while worker.is_alive():
+            worker.join(timeout=2)
+            status = knowledge_importer.status(job['id'])
+            print(f"{path}: {status['progress']:.1%} read, {status['chunks_indexed']} chunks indexed, "
+                  f"{status['docs_per_sec']} docs/sec", file=sys.stderr)
+        print(json.dumps(knowledge_importer.status(job['id'])))
+        failed = failed or job['status'] == 'failed'
+
+    if not failed:
+        rag_system.save_artifact(args.artifact)
+        print(f"Wrote {rag_system.document_count} documents to {args.artifact}")
+    return 1 if failed else 0
+
 # ============================================
 # MAIN
 # ============================================
 if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == 'import-knowledge':
+        sys.exit(import_knowledge_cli(sys.argv[2:]))
+
+    app = create_app()
+
     print("=" * 60)
     print("Doctor Workload Optimization System v2.0")
     print("Advanced RAG-Powered Medical Management")
     print("=" * 60)
-    print("\nSample data initialized!")
+    if app.config['LOAD_SAMPLE_DATA']:
+        print("\nSample data initialized!")
     print("Starting server on http://0.0.0.0:5000")
     print("\nIMPORTANT: For mobile testing, use your computer's IP address")
     print("Find it with: ipconfig (Windows) or ifconfig (Mac/Linux)")
@@ -0,0 +1,31 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+from stubs import FakeUpstream  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def fresh_rag(monkeypatch):
+    """Every test starts from an empty, unloaded knowledge base"""
+    monkeypatch.setattr(main, 'rag_system', main.AdvancedRAGSystem())
+
+
+@pytest.fixture(autouse=True)
+def fresh_upstream_state(monkeypatch):
+    """Fresh breaker, admission, backfill queue and router so tests cannot leak state"""
+    monkeypatch.setattr(main, 'llm_breaker', main.CircuitBreaker('groq', min_calls=3, open_seconds=30))
+    monkeypatch.setattr(main, 'admission', main.AdmissionController(4))
+    monkeypatch.setattr(main, 'ai_retry_queue', main.AIRetryQueue(interval=3600, max_attempts=2))
+    monkeypatch.setattr(main, 'model_router', main.ModelRouter(main.MODEL_ROUTES))
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    fake = FakeUpstream()
+    monkeypatch.setattr(main.requests, 'post', fake)
+    return fake
@@ -0,0 +1,37 @@
+"""Stand-ins for the Groq upstream used by the tests."""
+import threading
+
+import requests
+
+
+class FakeResponse:
+    def __init__(self, content='AI text', status_code=200):
+        self.content = content
+        self.status_code = status_code
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} error", response=self)
+
+    def json(self):
+        return {'choices': [{'message': {'content': self.content}}]}
+
+
+class FakeUpstream:
+    """Stand-in for requests.post that records calls and replays a behaviour"""
+
+    def __init__(self, behaviour=None):
+        self.behaviour = behaviour or (lambda: FakeResponse())
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, *args, **kwargs):
+        with self._lock:
+            self.calls += 1
+        return self.behaviour()
+
+
+def raise_error(error):
+    def behaviour():
+        raise error
+    return behaviour
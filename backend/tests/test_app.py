@@ -0,0 +1,34 @@
+"""Application factory configuration and readiness."""
+import pytest
+
+import main
+
+
+@pytest.mark.parametrize('warmup', ['Lazy', 'bg', ''])
+def test_unknown_warmup_mode_rejected(warmup):
+    with pytest.raises(ValueError, match='KNOWLEDGE_BASE_WARMUP'):
+        main.create_app({'KNOWLEDGE_BASE_WARMUP': warmup, 'LOAD_SAMPLE_DATA': False})
+
+
+def test_ready_after_eager_warmup(tmp_path):
+    artifact = tmp_path / 'kb.json'
+    seed = main.AdvancedRAGSystem()
+    seed.add_document('protocol_1', 'sepsis antibiotic protocol', {})
+    seed.save_artifact(str(artifact))
+
+    app = main.create_app({'KNOWLEDGE_BASE_WARMUP': 'eager', 'KNOWLEDGE_BASE_ARTIFACT': str(artifact),
+                           'LOAD_SAMPLE_DATA': False})
+    response = app.test_client().get('/api/ready')
+    assert response.status_code == 200
+    assert response.get_json()['knowledge_base_documents'] == 1
+
+
+def test_not_ready_when_artifact_fails_to_load(tmp_path):
+    artifact = tmp_path / 'kb.json'
+    artifact.write_text('{"version": 0}')
+
+    app = main.create_app({'KNOWLEDGE_BASE_WARMUP': 'eager', 'KNOWLEDGE_BASE_ARTIFACT': str(artifact),
+                           'LOAD_SAMPLE_DATA': False})
+    response = app.test_client().get('/api/ready')
+    assert response.status_code == 503
+    assert 'version' in response.get_json()['load_error']
@@ -0,0 +1,163 @@
+"""Knowledge base bulk import."""
+import json
+import time
+
+import pytest
+
+import main
+
+
+def run_import(tmp_path, fmt, data, batch_size=main.IMPORT_BATCH_SIZE):
+    path = tmp_path / f"corpus.{fmt}"
+    path.write_bytes(data.encode('utf-8'))
+    importer = main.KnowledgeImporter(batch_size=batch_size)
+    return importer.run_job(importer.create_job(str(path), fmt, 'corpus'))
+
+
+def test_malformed_ndjson_records_are_skipped(tmp_path):
+    lines = [
+        {'id': 'p1', 'content': 'sepsis protocol'},
+        {'id': 'p2', 'content': 5},
+        {'id': 'p3', 'content': 'ok', 'metadata': 7},
+        ['not', 'an', 'object'],
+        {'id': 'p4', 'text': 'insulin dosing', 'metadata': {'type': 'formulary'}},
+    ]
+    data = "\n".join(json.dumps(line) for line in lines) + "\n{broken\n"
+
+    job = run_import(tmp_path, 'ndjson', data)
+
+    assert job['status'] == 'completed'
+    assert job['errors'] == 4
+    assert job['documents_read'] == 2
+    assert [d['id'] for d in main.rag_system.knowledge_base] == ['p1#0', 'p4#0']
+    assert main.rag_system.knowledge_base[1]['metadata']['type'] == 'formulary'
+
+
+def test_text_documents_split_on_blank_lines_and_commit_whole(tmp_path):
+    long_doc = " ".join(f"w{i}" for i in range(2000))
+    data = f"{long_doc}\n\n\nsecond document\nstill second\n  \nthird"
+
+    job = run_import(tmp_path, 'text', data, batch_size=2)
+
+    assert job['status'] == 'completed'
+    assert job['documents_read'] == 3
+    assert job['batches_committed'] == 2
+    ids = [d['metadata']['document_id'] for d in main.rag_system.knowledge_base]
+    assert ids.count('corpus_0') == len(main.chunk_text(long_doc))
+    assert main.rag_system.semantic_search('still')[0]['content'] == 'second document still second'
+    assert main.rag_system.semantic_search('third')[0]['id'] == 'corpus_2#0'
+
+
+def test_text_without_newlines_is_read_in_pieces(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, 'TEXT_READ_LIMIT', 64)
+    monkeypatch.setattr(main, 'MAX_TEXT_DOCUMENT_WORDS', 100)
+    words = [f"term{i}" for i in range(250)]
+
+    job = run_import(tmp_path, 'text', " ".join(words))
+
+    assert job['status'] == 'completed'
+    assert job['documents_read'] == 3
+    indexed = set()
+    for doc in main.rag_system.knowledge_base:
+        indexed.update(doc['content'].split())
+    assert indexed == set(words)
+
+
+def test_reimport_replaces_documents_with_same_id(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, 'CHUNK_WORDS', 4)
+    monkeypatch.setattr(main, 'CHUNK_OVERLAP', 1)
+    first = "\n".join(json.dumps(r) for r in [
+        {'id': 'p1', 'content': 'sepsis fluids lactate antibiotics cultures vasopressors'},
+        {'id': 'p2', 'content': 'insulin sliding scale'},
+    ])
+    second = "\n".join(json.dumps(r) for r in [
+        {'id': 'p1', 'content': 'sepsis bundle revised'},
+        {'id': 'p2', 'content': 'insulin basal bolus'},
+    ])
+    run_import(tmp_path, 'ndjson', first)
+    job = run_import(tmp_path, 'ndjson', second)
+
+    rag = main.rag_system
+    assert job['status'] == 'completed'
+    assert len(rag.knowledge_base) == 5  # two p1 chunks and p2 left as empty slots
+    assert rag.document_count == 2
+    for term in ['lactate', 'vasopressors', 'sliding']:
+        assert rag.semantic_search(term) == []
+    assert [d['id'] for d in rag.semantic_search('sepsis')] == ['p1#0']
+    assert rag.semantic_search('basal')[0]['content'] == 'insulin basal bolus'
+
+    artifact = tmp_path / 'kb.json'
+    rag.save_artifact(str(artifact))
+    reloaded = main.AdvancedRAGSystem()
+    reloaded.load_artifact(str(artifact))
+    assert [d['id'] for d in reloaded.knowledge_base] == ['p1#0', 'p2#0']
+    assert reloaded.semantic_search('revised')[0]['id'] == 'p1#0'
+    assert reloaded.semantic_search('lactate') == []
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(main, 'knowledge_importer', main.KnowledgeImporter())
+    app = main.create_app({'KNOWLEDGE_BASE_WARMUP': 'lazy', 'LOAD_SAMPLE_DATA': False})
+    return app.test_client()
+
+
+def test_import_endpoint_indexes_in_background(client):
+    body = "\n".join(json.dumps({'id': f"p{i}", 'content': f"protocol {i}"}) for i in range(3))
+    response = client.post('/api/knowledge/import?source=protocols', data=body,
+                           content_type='application/x-ndjson')
+    assert response.status_code == 202
+    job_id = response.get_json()['job']['id']
+
+    for _ in range(200):
+        job = client.get(f'/api/knowledge/import/{job_id}').get_json()['job']
+        if job['status'] in ('completed', 'failed'):
+            break
+        time.sleep(0.01)
+    assert job['status'] == 'completed'
+    assert job['documents_read'] == 3
+    assert len(main.rag_system.semantic_search('protocol')) == 3
+
+
+def test_job_ids_are_not_reused(tmp_path):
+    path = tmp_path / 'corpus.text'
+    path.write_text('sepsis')
+    importer = main.KnowledgeImporter()
+    first = importer.create_job(str(path), 'text', 'corpus')
+    importer.jobs.clear()
+    assert importer.create_job(str(path), 'text', 'corpus') != first
+
+
+def test_multipart_import_without_file_part_rejected(client, tmp_path, monkeypatch):
+    monkeypatch.setattr(main.tempfile, 'tempdir', str(tmp_path))
+    response = client.post('/api/knowledge/import', data={'other': 'x'},
+                           content_type='multipart/form-data')
+    assert response.status_code == 400
+    assert main.knowledge_importer.jobs == {}
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_temp_file_removed_when_upload_copy_fails(client, tmp_path, monkeypatch):
+    monkeypatch.setattr(main.tempfile, 'tempdir', str(tmp_path))
+
+    def broken_copy(*args, **kwargs):
+        raise OSError("client disconnected")
+    monkeypatch.setattr(main.shutil, 'copyfileobj', broken_copy)
+
+    response = client.post('/api/knowledge/import', data='text', content_type='text/plain')
+    assert response.status_code == 500
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_cli_checks_all_inputs_before_importing(tmp_path, capsys):
+    present = tmp_path / 'a.ndjson'
+    present.write_text(json.dumps({'id': 'a', 'content': 'sepsis'}) + "\n")
+    artifact = tmp_path / 'kb.json'
+
+    with pytest.raises(SystemExit) as exc:
+        main.import_knowledge_cli([str(present), str(tmp_path / 'missing.ndjson'), '--artifact', str(artifact)])
+
+    assert exc.value.code == 2
+    assert 'missing.ndjson' in capsys.readouterr().err
+    assert not artifact.exists()
+    assert main.rag_system.knowledge_base == []
@@ -0,0 +1,132 @@
+"""Circuit breaker, admission control and backfill queue.
+
+Upstream calls are stubbed through the `upstream` fixture from conftest.
+"""
+import pytest
+import requests
+
+import main
+from stubs import FakeResponse, raise_error
+
+
+def test_breaker_opens_probes_once_when_half_open_then_closes(upstream):
+    upstream.behaviour = raise_error(requests.ConnectionError("down"))
+    for _ in range(3):
+        text, route = main.rag_system.generate_routed("p", task='triage', fallback='rule')
+        assert (text, route['path']) == ('rule', 'rule_based')
+    assert main.llm_breaker.state == main.CircuitBreaker.OPEN
+
+    calls = upstream.calls
+    text, route = main.rag_system.generate_routed("p", task='triage', fallback='rule')
+    assert route['path'] == 'degraded'
+    assert upstream.calls == calls
+
+    main.llm_breaker.opened_at -= main.llm_breaker.open_seconds
+    assert main.llm_breaker.allow_request()
+    assert main.llm_breaker.state == main.CircuitBreaker.HALF_OPEN
+    assert not main.llm_breaker.allow_request()
+
+    main.llm_breaker.record_success()
+    assert main.llm_breaker.state == main.CircuitBreaker.CLOSED
+    upstream.behaviour = lambda: FakeResponse('AI triage')
+    text, route = main.rag_system.generate_routed("p", task='triage', fallback='rule')
+    assert (text, route['path']) == ('AI triage', 'primary')
+
+
+def test_failed_probe_reopens_breaker():
+    breaker = main.llm_breaker
+    for _ in range(3):
+        breaker.record_failure()
+    breaker.opened_at -= breaker.open_seconds
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == main.CircuitBreaker.OPEN
+    assert not breaker.allow_request()
+
+
+def test_client_errors_and_rushed_timeouts_do_not_open_breaker(upstream):
+    upstream.behaviour = lambda: FakeResponse(status_code=400)
+    for _ in range(5):
+        main.rag_system.generate_routed("p", task='triage', fallback='rule')
+
+    upstream.behaviour = raise_error(requests.Timeout("slow"))
+    for _ in range(5):
+        with pytest.raises(requests.Timeout):
+            main.rag_system.call_llm("p", main.FAST_MODEL, timeout=0.5)
+
+    assert main.llm_breaker.state == main.CircuitBreaker.CLOSED
+    assert main.llm_breaker.stats()['window_failures'] == 0
+
+
+def test_server_errors_open_breaker(upstream):
+    upstream.behaviour = lambda: FakeResponse(status_code=503)
+    for _ in range(3):
+        main.rag_system.generate_routed("p", task='triage', fallback='rule')
+    assert main.llm_breaker.state == main.CircuitBreaker.OPEN
+
+
+def test_sheddable_task_refused_at_half_capacity(upstream):
+    assert main.admission.try_acquire('triage')
+    assert main.admission.try_acquire('triage')
+
+    text, route = main.rag_system.generate_routed("p", task='chatbot', fallback='busy')
+    assert (text, route['path']) == ('busy', 'shed')
+    assert upstream.calls == 0
+
+    text, route = main.rag_system.generate_routed("p", task='triage', fallback='rule')
+    assert route['path'] == 'primary'
+    assert main.admission.stats()['inflight'] == 2
+    assert main.admission.stats()['shed'] == {'chatbot': 1}
+
+
+def test_clinical_task_refused_only_at_full_capacity(upstream):
+    for _ in range(4):
+        assert main.admission.try_acquire('soap')
+    text, route = main.rag_system.generate_routed("p", task='triage', fallback='rule')
+    assert route['path'] == 'shed'
+    for _ in range(4):
+        main.admission.release()
+    assert main.admission.stats()['inflight'] == 0
+
+
+def test_backfill_updates_record_and_knowledge_base(upstream):
+    main.rag_system.add_document('medical_record_1', 'Subjective: placeholder', {'type': 'medical_record'})
+    record = {'structured_documentation': 'Subjective: placeholder', 'ai_route': {'path': 'degraded'}}
+    main.ai_retry_queue.enqueue(
+        record, 'structured_documentation', 'prompt', 'soap',
+        on_complete=lambda text: main.rag_system.update_document('medical_record_1', text))
+    assert record['ai_route']['backfill'] == 'pending'
+
+    upstream.behaviour = lambda: FakeResponse('Assessment: community acquired pneumonia')
+    assert main.ai_retry_queue.drain() == 1
+
+    assert record['structured_documentation'] == 'Assessment: community acquired pneumonia'
+    assert record['ai_route']['path'] == 'backfilled'
+    assert record['ai_route']['backfill'] == 'done'
+    assert main.rag_system.knowledge_base[0]['content'] == record['structured_documentation']
+    assert main.rag_system.semantic_search('pneumonia')[0]['id'] == 'medical_record_1'
+    assert main.rag_system.semantic_search('placeholder') == []
+
+
+def test_backfill_gives_up_after_max_attempts(upstream):
+    upstream.behaviour = lambda: FakeResponse(status_code=500)
+    record = {'triage_assessment': 'rule', 'ai_route': {'path': 'rule_based'}}
+    main.ai_retry_queue.enqueue(record, 'triage_assessment', 'prompt', 'triage')
+
+    assert main.ai_retry_queue.drain() == 0
+    assert main.ai_retry_queue.stats()['pending'] == 1
+    assert main.ai_retry_queue.drain() == 0
+    assert main.ai_retry_queue.stats()['pending'] == 0
+    assert record['ai_route']['backfill'] == 'failed'
+    assert record['triage_assessment'] == 'rule'
+
+
+def test_backfill_waits_while_circuit_open(upstream):
+    for _ in range(3):
+        main.llm_breaker.record_failure()
+    record = {'triage_assessment': 'rule', 'ai_route': {'path': 'degraded'}}
+    main.ai_retry_queue.enqueue(record, 'triage_assessment', 'prompt', 'triage')
+
+    assert main.ai_retry_queue.drain() == 0
+    assert upstream.calls == 0
+    assert main.ai_retry_queue.stats()['pending'] == 1
@@ -0,0 +1,73 @@
+"""Latency-aware model routing: fallbacks, latency estimates and call budgets."""
+import time
+
+import pytest
+import requests
+
+import main
+from stubs import FakeResponse, raise_error
+
+
+def test_router_falls_back_to_fast_model(upstream):
+    def behaviour():
+        if upstream.calls == 1:
+            raise requests.ConnectionError("large model down")
+        return FakeResponse('fast answer')
+    upstream.behaviour = behaviour
+
+    text, route = main.rag_system.generate_routed("p", task='handover', fallback='rule')
+    assert (text, route['path'], route['model']) == ('fast answer', 'fallback_model', main.FAST_MODEL)
+
+
+def test_timeouts_do_not_pin_latency_estimate(upstream):
+    upstream.behaviour = raise_error(requests.Timeout("slow"))
+    main.rag_system.generate_routed("p", task='handover', fallback='rule')
+    assert main.model_router.estimate(main.FAST_MODEL) == main.DEFAULT_LATENCY_ESTIMATES[main.FAST_MODEL]
+
+    upstream.behaviour = lambda: FakeResponse('AI triage')
+    text, route = main.rag_system.generate_routed("p", task='triage', fallback='rule')
+    assert route['path'] == 'primary'
+
+
+def test_slow_estimate_decays_back_to_default():
+    router = main.model_router
+    router.latency_samples[main.FAST_MODEL] = (9.0, time.monotonic())
+    assert router.estimate(main.FAST_MODEL) > 8.9
+
+    stale = time.monotonic() - 10 * main.LATENCY_DECAY_HALF_LIFE
+    router.latency_samples[main.FAST_MODEL] = (9.0, stale)
+    assert router.estimate(main.FAST_MODEL) < 1.01
+
+
+def test_call_budget_bounds_total_elapsed_time(upstream):
+    upstream.behaviour = lambda: time.sleep(3) or FakeResponse()
+    started = time.monotonic()
+    text, route = main.rag_system.generate_routed("p", task='triage', deadline=main.Deadline(1.2), fallback='rule')
+    assert route['path'] == 'rule_based'
+    assert route['attempts'] == [{'model': main.FAST_MODEL, 'outcome': 'error'}]
+    assert time.monotonic() - started < 1.5
+
+
+@pytest.mark.parametrize('body, headers', [
+    ({'deadline_ms': 0}, {}),
+    ({}, {'X-Request-Deadline-Ms': '0'}),
+    ({'deadline_ms': 50}, {}),
+])
+def test_zero_or_tiny_deadline_returns_rule_based_immediately(upstream, body, headers):
+    app = main.create_app({'KNOWLEDGE_BASE_WARMUP': 'lazy', 'LOAD_SAMPLE_DATA': False})
+    with app.test_request_context(headers=headers):
+        deadline = main.request_deadline(body, 'triage')
+    assert deadline.remaining() <= 0.05
+
+    started = time.monotonic()
+    text, route = main.rag_system.generate_routed("p", task='triage', deadline=deadline, fallback='rule')
+    assert (text, route['path']) == ('rule', 'rule_based')
+    assert upstream.calls == 0
+    assert time.monotonic() - started < 0.1
+
+
+def test_missing_deadline_uses_task_default():
+    app = main.create_app({'KNOWLEDGE_BASE_WARMUP': 'lazy', 'LOAD_SAMPLE_DATA': False})
+    with app.test_request_context():
+        deadline = main.request_deadline({}, 'triage')
+    assert 4.9 < deadline.remaining() <= main.MODEL_ROUTES['triage']['deadline']